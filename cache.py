@@ -1,80 +1,237 @@
 """Cache management for OSRS status data."""
 
+import asyncio
+import datetime as dt
 import logging
+import math
+import random
 import time
-from typing import TypedDict
-
-from config import CACHE_DURATION
+from typing import Any, NamedTuple, TypedDict
+
+import orjson
+
+from config import (
+    CACHE_DURATION,
+    CLOCK_RESOLUTION,
+    MAX_CACHE_DURATION,
+    OSRS_HOMEPAGE,
+    REFRESH_MARGIN,
+)
+from models import DetailedStatusResponse, GameStatusResponse
 from scraper import get_player_count, get_player_count_text
 
 logger = logging.getLogger(__name__)
 
-# Just playing around, not sure how much this improves readability.
-IsOnline = bool
-PlayerCount = int
-IsHomePageAccessible = bool
-GameStatus = tuple[IsOnline | None, PlayerCount, IsHomePageAccessible]
+
+class GameStatus(NamedTuple):
+    """Game status as scraped from the OSRS homepage."""
+
+    is_online: bool | None  # None if unknown
+    player_count: int  # 0 if unknown
+    homepage_accessible: bool
+
+
+class CacheSnapshot(NamedTuple):
+    """Everything cached from one refresh. Replaced as a whole, never mutated."""
+
+    game_status: GameStatus
+    timestamp: float  # Cached monotonic clock reading of the refresh
+    ttl: float  # Seconds the refresh stays cached for
+    expires_at: float  # Cached monotonic clock reading the refresh expires at
+    consecutive_failures: int  # Refreshes in a row, up to this one, that couldn't reach the homepage
+    etag: str  # Weak ETag for responses built from this refresh
+    response: bytes  # Prebuilt root endpoint body, already JSON encoded
+    detailed_response: dict[str, Any]  # Prebuilt status endpoint payload, cache age as of the refresh
+
+
+class CacheInfo(TypedDict):
+    """Type definition for cache information reported by the status endpoint."""
+
+    cache_age_seconds: float
+    cache_expires_in_seconds: float
+
+
+# Latest refresh; rebinding it is atomic, so readers never need the lock
+_snapshot: CacheSnapshot | None = None
+
+# Monotonic clock reading kept current by tick_clock(), so cache hits skip the clock call
+_cached_monotonic: float = time.monotonic()
+
+# Only one coroutine refreshes the cache at a time; the rest serve the previous data or wait for its result
+_refresh_lock = asyncio.Lock()
+
+# Failed refreshes after which the backoff TTL has reached MAX_CACHE_DURATION
+_MAX_BACKOFF_FAILURES = max(1, math.ceil(math.log2(MAX_CACHE_DURATION / CACHE_DURATION)))
+
+
+def _backoff_ttl(consecutive_failures: int) -> float:
+    """Get how long to cache a result for, doubling per failed refresh up to MAX_CACHE_DURATION."""
+    if not consecutive_failures:
+        return CACHE_DURATION
+
+    # Clamp the exponent, past the ceiling it only grows toward a float overflow
+    ttl = min(CACHE_DURATION * 2.0 ** min(consecutive_failures, _MAX_BACKOFF_FAILURES), MAX_CACHE_DURATION)
+    # Jitter so separate workers don't retry the homepage in lockstep
+    return ttl * random.uniform(0.9, 1.1)  # noqa: S311
+
+
+def _build_etag(game_status: GameStatus, wall_ts: float) -> str:
+    """Build a weak ETag that stays the same for as long as the cached status does."""
+    return (
+        f'W/"{int(wall_ts)}-{game_status.player_count}'
+        f'-{int(bool(game_status.is_online))}-{int(game_status.homepage_accessible)}"'
+    )
+
+
+def _build_response(game_status: GameStatus) -> GameStatusResponse:
+    """Build the root endpoint response for a game status."""
+    if not game_status.homepage_accessible:
+        return GameStatusResponse(
+            status="unknown",
+            player_count=0,
+            message="OSRS status unknown - homepage inaccessible",
+        )
+
+    is_online = game_status.is_online
+    return GameStatusResponse(
+        status="online" if is_online else "offline",
+        player_count=game_status.player_count,
+        message=f"OSRS is {'online' if is_online else 'offline'}"
+        + (f" with {game_status.player_count:,} players" if is_online else ""),
+    )
 
 
-class CacheData(TypedDict):
-    """Type definition for cache storage."""
+def _build_detailed_response(game_status: GameStatus, timestamp_iso: str, ttl: float) -> DetailedStatusResponse:
+    """Build the status endpoint response for a freshly refreshed game status."""
+    return DetailedStatusResponse(
+        game="Old School RuneScape",
+        online=game_status.is_online,
+        player_count=game_status.player_count,
+        homepage_accessible=game_status.homepage_accessible,
+        source=OSRS_HOMEPAGE,
+        cache_age_seconds=0.0,
+        cache_expires_in_seconds=round(ttl, 1),
+        cache_timestamp=timestamp_iso,
+    )
 
-    data: GameStatus | None
-    timestamp: float
 
+async def tick_clock() -> None:
+    """Update the cached monotonic clock every CLOCK_RESOLUTION seconds. Runs as a background task."""
+    global _cached_monotonic  # noqa: PLW0603
+    while True:
+        _cached_monotonic = time.monotonic()
+        await asyncio.sleep(CLOCK_RESOLUTION)
 
-_cache: CacheData = {
-    "data": None,
-    "timestamp": 0,
-}
 
+def _fresh_snapshot() -> CacheSnapshot | None:
+    """Get the latest refresh if it is still within its TTL."""
+    snapshot = _snapshot
+    if snapshot is not None and _cached_monotonic < snapshot.expires_at:
+        return snapshot
+    return None
 
-def is_game_online() -> GameStatus:
+
+async def _refresh() -> CacheSnapshot:
+    """Fetch fresh data from the OSRS homepage and cache it. Caller must hold _refresh_lock."""
+    global _snapshot  # noqa: PLW0603
+    logger.info("Fetching fresh data from OSRS homepage")
+    text = await get_player_count_text()
+
+    previous_failures = _snapshot.consecutive_failures if _snapshot is not None else 0
+    if text is None:
+        # Homepage is inaccessible, back off before trying it again
+        result = GameStatus(is_online=None, player_count=0, homepage_accessible=False)
+        # Stop counting once the backoff has hit its ceiling
+        consecutive_failures = min(previous_failures + 1, _MAX_BACKOFF_FAILURES)
+    else:
+        # Homepage is accessible, determine status
+        player_count = get_player_count(text)
+        result = GameStatus(is_online=player_count > 0, player_count=player_count, homepage_accessible=True)
+        consecutive_failures = 0
+
+    ttl = _backoff_ttl(consecutive_failures)
+    wall_ts = time.time()
+    timestamp_iso = dt.datetime.fromtimestamp(wall_ts, dt.UTC).isoformat()
+
+    # Build responses once per refresh rather than once per request, then publish them all at once
+    _snapshot = CacheSnapshot(
+        game_status=result,
+        timestamp=_cached_monotonic,
+        ttl=ttl,
+        expires_at=_cached_monotonic + ttl,
+        consecutive_failures=consecutive_failures,
+        etag=_build_etag(result, wall_ts),
+        response=orjson.dumps(_build_response(result).model_dump()),
+        detailed_response=_build_detailed_response(result, timestamp_iso, ttl).model_dump(),
+    )
+    return _snapshot
+
+
+async def get_cache_snapshot() -> CacheSnapshot:
+    """Get the latest refresh, fetching fresh data first if the cache has expired."""
+    # Check if we have cached data that's still valid
+    snapshot = _fresh_snapshot()
+    if snapshot is not None:
+        logger.info("Serving cached data")
+        return snapshot
+
+    # The background refresh is already fetching, serve the expiring data instead of waiting on it
+    if _refresh_lock.locked() and _snapshot is not None:
+        logger.info("Serving stale data while the cache refreshes")
+        return _snapshot
+
+    async with _refresh_lock:
+        # Another request may have refreshed the cache while we were waiting
+        snapshot = _fresh_snapshot()
+        if snapshot is not None:
+            logger.info("Serving cached data")
+            return snapshot
+
+        # Cache expired or doesn't exist, fetch new data
+        return await _refresh()
+
+
+async def is_game_online() -> GameStatus:
     """
     Check if the game is online based on player count with caching.
 
     Returns:
-        tuple: (is_online, player_count, homepage_accessible)
+        GameStatus: (is_online, player_count, homepage_accessible)
         - is_online: True if online, False if offline, None if unknown
         - player_count: Number of players (0 if unknown)
         - homepage_accessible: True if OSRS homepage was accessible
 
     """
-    current_time = time.time()
+    return (await get_cache_snapshot()).game_status
 
-    # Check if we have cached data that's still valid
-    if (
-        _cache["data"] is not None
-        and current_time - _cache["timestamp"] < CACHE_DURATION
-    ):
-        logger.info("Serving cached data")
-        return _cache["data"]
 
-    # Cache expired or doesn't exist, fetch new data
-    logger.info("Fetching fresh data from OSRS homepage")
-    text = get_player_count_text()
+async def refresh_cache() -> GameStatus:
+    """Fetch fresh data from the OSRS homepage and cache it, even if the cached data is still valid."""
+    async with _refresh_lock:
+        return (await _refresh()).game_status
 
-    if text is None:
-        # Homepage is inaccessible
-        result = (None, 0, False)
-    else:
-        # Homepage is accessible, determine status
-        player_count = get_player_count(text)
-        is_online = player_count > 0
-        result = (is_online, player_count, True)
 
-    # Cache the result
-    _cache["data"] = result
-    _cache["timestamp"] = current_time
+async def keep_cache_warm() -> None:
+    """Refresh the cache REFRESH_MARGIN seconds before it expires. Runs as a background task."""
+    # Each deadline is set from the previous one, so time spent fetching doesn't push the schedule back
+    next_deadline = _snapshot.expires_at - REFRESH_MARGIN if _snapshot is not None else 0.0
+    while True:
+        await asyncio.sleep(max(0, next_deadline - time.monotonic()))
+
+        try:
+            await refresh_cache()
+        except Exception:
+            logger.exception("Error refreshing cache")
 
-    return result
+        # If a slow fetch made us miss a deadline, refresh once now rather than catching up
+        ttl = _snapshot.ttl if _snapshot is not None else CACHE_DURATION
+        next_deadline = max(next_deadline + ttl - REFRESH_MARGIN, time.monotonic())
 
 
-def get_cache_info() -> dict:
+def get_cache_info(snapshot: CacheSnapshot) -> CacheInfo:
     """Get cache information for status endpoint."""
-    cache_age = time.time() - _cache["timestamp"] if _cache["data"] else 0
+    now = _cached_monotonic
     return {
-        "cache_age_seconds": round(cache_age, 1),
-        "cache_expires_in_seconds": max(0, round(CACHE_DURATION - cache_age, 1)),
-        "timestamp": _cache["timestamp"],
+        "cache_age_seconds": round(max(0.0, now - snapshot.timestamp), 1),
+        "cache_expires_in_seconds": max(0.0, round(snapshot.expires_at - now, 1)),
     }
@@ -5,9 +5,13 @@ OSRS_HOMEPAGE = "https://oldschool.runescape.com"
 
 # Cache Configuration
 CACHE_DURATION = 60  # Seconds
+MAX_CACHE_DURATION = 600  # Seconds, ceiling for backing off while the homepage is inaccessible
+REFRESH_MARGIN = 5  # Seconds before expiry to refresh the cache in the background
+CLOCK_RESOLUTION = 0.1  # Seconds between cached clock updates
 
 # User Agent for requests
 USER_AGENT = "OSRS-Status-Monitor/1.0 (https://github.com/JoshPaulie/OSWatch) - Monitoring server status with 60s cache"
 
 # Request Configuration
 REQUEST_TIMEOUT = 30  # Seconds
+MAX_PAGE_BYTES = 512 * 1024  # Stop reading the homepage after this many (decompressed) bytes
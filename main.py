@@ -1,19 +1,46 @@
 """OSRS World Status API - Monitor Old School RuneScape server status."""
 
-import datetime as dt
+import asyncio
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import Any
 
-from fastapi import FastAPI
+import orjson
+from fastapi import FastAPI, Request, Response
 from fastapi.openapi.utils import get_openapi
 
-from cache import get_cache_info, is_game_online
-from config import OSRS_HOMEPAGE
+from cache import get_cache_info, get_cache_snapshot, is_game_online, keep_cache_warm, tick_clock
 from models import DetailedStatusResponse, GameStatusResponse
+from scraper import close_client
 
 # --- Configure logging ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+# --- App lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run background tasks for the lifetime of the app."""
+    tasks = [asyncio.create_task(tick_clock())]
+    try:
+        # Build the OpenAPI schema up front instead of on the first docs request
+        app.openapi()
+        # Warm the cache before serving, then keep it from ever expiring
+        await is_game_online()
+        tasks.append(asyncio.create_task(keep_cache_warm()))
+        yield
+    finally:
+        # Let an in-flight refresh finish unwinding before its client is closed
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        await close_client()
+
+
 # --- FastAPI app ---
 app = FastAPI(
     title="OSRS World Status API",
@@ -21,10 +48,59 @@ app = FastAPI(
     "Responses are cached for 1 minute to reduce load on OSRS servers. "
     "To be used as an intermediary for your automation.",
     version="1.0.2",
+    lifespan=lifespan,
 )
 
 
-def custom_openapi() -> dict:
+# --- OpenAPI code samples ---
+ROOT_CODE_SAMPLES = [
+    {
+        "lang": "bash",
+        "label": "cURL",
+        "source": 'curl -X GET "https://oswatch.bexli.dev/" \\\n  -H "Accept: application/json"',
+    },
+    {
+        "lang": "python",
+        "label": "Python (requests)",
+        "source": 'import requests\n\nresponse = requests.get("https://oswatch.bexli.dev/")\ndata = response.json()\n\nprint(f"Status: {data[\'status\']}")\nprint(f"Players: {data[\'player_count\']:,}")\nprint(f"Message: {data[\'message\']}")',
+    },
+    {
+        "lang": "javascript",
+        "label": "JavaScript (fetch)",
+        "source": "fetch('https://oswatch.bexli.dev/')\n  .then(response => response.json())\n  .then(data => {\n    console.log(`Status: ${data.status}`);\n    console.log(`Players: ${data.player_count.toLocaleString()}`);\n    console.log(`Message: ${data.message}`);\n  })\n  .catch(error => console.error('Error:', error));",
+    },
+    {
+        "lang": "go",
+        "label": "Go",
+        "source": 'package main\n\nimport (\n    "encoding/json"\n    "fmt"\n    "net/http"\n)\n\n// GameStatusResponse represents the response from the root endpoint (/)\ntype GameStatusResponse struct {\n    Status      string `json:"status"`       // "online", "offline", or "unknown"\n    PlayerCount int    `json:"player_count"` // Current number of players online\n    Message     string `json:"message"`      // Human-readable status message\n}\n\n// getGameStatus fetches basic game status with proper error handling\nfunc getGameStatus() (*GameStatusResponse, error) {\n    resp, err := http.Get("https://oswatch.bexli.dev/")\n    if err != nil {\n        return nil, fmt.Errorf("failed to fetch status: %w", err)\n    }\n    defer resp.Body.Close()\n\n    if resp.StatusCode != http.StatusOK {\n        return nil, fmt.Errorf("API returned status code: %d", resp.StatusCode)\n    }\n\n    var status GameStatusResponse\n    if err := json.NewDecoder(resp.Body).Decode(&status); err != nil {\n        return nil, fmt.Errorf("failed to decode response: %w", err)\n    }\n\n    return &status, nil\n}\n\nfunc main() {\n    status, err := getGameStatus()\n    if err != nil {\n        fmt.Printf("Error fetching status: %v\\n", err)\n        return\n    }\n\n    fmt.Printf("Status: %s\\n", status.Status)\n    fmt.Printf("Players: %d\\n", status.PlayerCount)\n    fmt.Printf("Message: %s\\n", status.Message)\n}',
+    },
+]
+
+STATUS_CODE_SAMPLES = [
+    {
+        "lang": "bash",
+        "label": "cURL",
+        "source": 'curl -X GET "https://oswatch.bexli.dev/status" \\\n  -H "Accept: application/json"',
+    },
+    {
+        "lang": "python",
+        "label": "Python (requests)",
+        "source": 'import requests\nfrom datetime import datetime\n\nresponse = requests.get("https://oswatch.bexli.dev/status")\ndata = response.json()\n\nprint(f"Game: {data[\'game\']}")\nprint(f"Online: {data[\'online\']}")\nprint(f"Players: {data[\'player_count\']:,}")\nprint(f"Homepage accessible: {data[\'homepage_accessible\']}")\nprint(f"Cache age: {data[\'cache_age_seconds\']:.1f}s")\nprint(f"Cache expires in: {data[\'cache_expires_in_seconds\']:.1f}s")\nprint(f"Last updated: {data[\'cache_timestamp\']}")',
+    },
+    {
+        "lang": "javascript",
+        "label": "JavaScript (fetch)",
+        "source": "fetch('https://oswatch.bexli.dev/status')\n  .then(response => response.json())\n  .then(data => {\n    console.log(`Game: ${data.game}`);\n    console.log(`Online: ${data.online}`);\n    console.log(`Players: ${data.player_count.toLocaleString()}`);\n    console.log(`Homepage accessible: ${data.homepage_accessible}`);\n    console.log(`Cache age: ${data.cache_age_seconds.toFixed(1)}s`);\n    console.log(`Cache expires in: ${data.cache_expires_in_seconds.toFixed(1)}s`);\n    console.log(`Last updated: ${data.cache_timestamp}`);\n  })\n  .catch(error => console.error('Error:', error));",
+    },
+    {
+        "lang": "go",
+        "label": "Go",
+        "source": 'package main\n\nimport (\n    "encoding/json"\n    "fmt"\n    "net/http"\n)\n\n// DetailedStatusResponse represents the response from the detailed status endpoint (/status)\ntype DetailedStatusResponse struct {\n    Game                    string   `json:"game"`                       // Full name of the game being monitored\n    Online                  *bool    `json:"online"`                     // Whether the game is online (null if unknown)\n    PlayerCount             int      `json:"player_count"`               // Current number of players online\n    HomepageAccessible      bool     `json:"homepage_accessible"`        // Whether the OSRS homepage is accessible\n    Source                  string   `json:"source"`                     // Source URL where status information is retrieved\n    CacheAgeSeconds         float64  `json:"cache_age_seconds"`          // How old the cached data is in seconds\n    CacheExpiresInSeconds   float64  `json:"cache_expires_in_seconds"`   // How long until the cache expires\n    CacheTimestamp          string   `json:"cache_timestamp"`            // ISO 8601 timestamp of cached data (UTC)\n}\n\n// getDetailedStatus fetches detailed status with cache information\nfunc getDetailedStatus() (*DetailedStatusResponse, error) {\n    resp, err := http.Get("https://oswatch.bexli.dev/status")\n    if err != nil {\n        return nil, fmt.Errorf("failed to fetch detailed status: %w", err)\n    }\n    defer resp.Body.Close()\n\n    if resp.StatusCode != http.StatusOK {\n        return nil, fmt.Errorf("API returned status code: %d", resp.StatusCode)\n    }\n\n    var status DetailedStatusResponse\n    if err := json.NewDecoder(resp.Body).Decode(&status); err != nil {\n        return nil, fmt.Errorf("failed to decode response: %w", err)\n    }\n\n    return &status, nil\n}\n\nfunc main() {\n    detailed, err := getDetailedStatus()\n    if err != nil {\n        fmt.Printf("Error fetching detailed status: %v\\n", err)\n        return\n    }\n\n    fmt.Printf("Game: %s\\n", detailed.Game)\n    if detailed.Online != nil {\n        fmt.Printf("Online: %t\\n", *detailed.Online)\n    } else {\n        fmt.Printf("Online: unknown\\n")\n    }\n    fmt.Printf("Players: %d\\n", detailed.PlayerCount)\n    fmt.Printf("Homepage accessible: %t\\n", detailed.HomepageAccessible)\n    fmt.Printf("Cache age: %.1fs\\n", detailed.CacheAgeSeconds)\n    fmt.Printf("Cache expires in: %.1fs\\n", detailed.CacheExpiresInSeconds)\n    fmt.Printf("Last updated: %s\\n", detailed.CacheTimestamp)\n}',
+    },
+]
+
+
+def custom_openapi() -> dict[str, Any]:
     """Generate custom OpenAPI schema with multi-language code examples."""
     if app.openapi_schema:
         return app.openapi_schema
@@ -36,55 +112,11 @@ def custom_openapi() -> dict:
         routes=app.routes,
     )
 
-    # Add code examples for the root endpoint
+    # Add code examples for each endpoint
     if "/" in openapi_schema["paths"]:
-        openapi_schema["paths"]["/"]["get"]["x-code-samples"] = [
-            {
-                "lang": "bash",
-                "label": "cURL",
-                "source": 'curl -X GET "https://oswatch.bexli.dev/" \\\n  -H "Accept: application/json"',
-            },
-            {
-                "lang": "python",
-                "label": "Python (requests)",
-                "source": 'import requests\n\nresponse = requests.get("https://oswatch.bexli.dev/")\ndata = response.json()\n\nprint(f"Status: {data[\'status\']}")\nprint(f"Players: {data[\'player_count\']:,}")\nprint(f"Message: {data[\'message\']}")',
-            },
-            {
-                "lang": "javascript",
-                "label": "JavaScript (fetch)",
-                "source": "fetch('https://oswatch.bexli.dev/')\n  .then(response => response.json())\n  .then(data => {\n    console.log(`Status: ${data.status}`);\n    console.log(`Players: ${data.player_count.toLocaleString()}`);\n    console.log(`Message: ${data.message}`);\n  })\n  .catch(error => console.error('Error:', error));",
-            },
-            {
-                "lang": "go",
-                "label": "Go",
-                "source": 'package main\n\nimport (\n    "encoding/json"\n    "fmt"\n    "net/http"\n)\n\n// GameStatusResponse represents the response from the root endpoint (/)\ntype GameStatusResponse struct {\n    Status      string `json:"status"`       // "online", "offline", or "unknown"\n    PlayerCount int    `json:"player_count"` // Current number of players online\n    Message     string `json:"message"`      // Human-readable status message\n}\n\n// getGameStatus fetches basic game status with proper error handling\nfunc getGameStatus() (*GameStatusResponse, error) {\n    resp, err := http.Get("https://oswatch.bexli.dev/")\n    if err != nil {\n        return nil, fmt.Errorf("failed to fetch status: %w", err)\n    }\n    defer resp.Body.Close()\n\n    if resp.StatusCode != http.StatusOK {\n        return nil, fmt.Errorf("API returned status code: %d", resp.StatusCode)\n    }\n\n    var status GameStatusResponse\n    if err := json.NewDecoder(resp.Body).Decode(&status); err != nil {\n        return nil, fmt.Errorf("failed to decode response: %w", err)\n    }\n\n    return &status, nil\n}\n\nfunc main() {\n    status, err := getGameStatus()\n    if err != nil {\n        fmt.Printf("Error fetching status: %v\\n", err)\n        return\n    }\n\n    fmt.Printf("Status: %s\\n", status.Status)\n    fmt.Printf("Players: %d\\n", status.PlayerCount)\n    fmt.Printf("Message: %s\\n", status.Message)\n}',
-            },
-        ]
-
-    # Add code examples for the status endpoint
+        openapi_schema["paths"]["/"]["get"]["x-code-samples"] = ROOT_CODE_SAMPLES
     if "/status" in openapi_schema["paths"]:
-        openapi_schema["paths"]["/status"]["get"]["x-code-samples"] = [
-            {
-                "lang": "bash",
-                "label": "cURL",
-                "source": 'curl -X GET "https://oswatch.bexli.dev/status" \\\n  -H "Accept: application/json"',
-            },
-            {
-                "lang": "python",
-                "label": "Python (requests)",
-                "source": 'import requests\nfrom datetime import datetime\n\nresponse = requests.get("https://oswatch.bexli.dev/status")\ndata = response.json()\n\nprint(f"Game: {data[\'game\']}")\nprint(f"Online: {data[\'online\']}")\nprint(f"Players: {data[\'player_count\']:,}")\nprint(f"Homepage accessible: {data[\'homepage_accessible\']}")\nprint(f"Cache age: {data[\'cache_age_seconds\']:.1f}s")\nprint(f"Cache expires in: {data[\'cache_expires_in_seconds\']:.1f}s")\nprint(f"Last updated: {data[\'cache_timestamp\']}")',
-            },
-            {
-                "lang": "javascript",
-                "label": "JavaScript (fetch)",
-                "source": "fetch('https://oswatch.bexli.dev/status')\n  .then(response => response.json())\n  .then(data => {\n    console.log(`Game: ${data.game}`);\n    console.log(`Online: ${data.online}`);\n    console.log(`Players: ${data.player_count.toLocaleString()}`);\n    console.log(`Homepage accessible: ${data.homepage_accessible}`);\n    console.log(`Cache age: ${data.cache_age_seconds.toFixed(1)}s`);\n    console.log(`Cache expires in: ${data.cache_expires_in_seconds.toFixed(1)}s`);\n    console.log(`Last updated: ${data.cache_timestamp}`);\n  })\n  .catch(error => console.error('Error:', error));",
-            },
-            {
-                "lang": "go",
-                "label": "Go",
-                "source": 'package main\n\nimport (\n    "encoding/json"\n    "fmt"\n    "net/http"\n)\n\n// DetailedStatusResponse represents the response from the detailed status endpoint (/status)\ntype DetailedStatusResponse struct {\n    Game                    string   `json:"game"`                       // Full name of the game being monitored\n    Online                  *bool    `json:"online"`                     // Whether the game is online (null if unknown)\n    PlayerCount             int      `json:"player_count"`               // Current number of players online\n    HomepageAccessible      bool     `json:"homepage_accessible"`        // Whether the OSRS homepage is accessible\n    Source                  string   `json:"source"`                     // Source URL where status information is retrieved\n    CacheAgeSeconds         float64  `json:"cache_age_seconds"`          // How old the cached data is in seconds\n    CacheExpiresInSeconds   float64  `json:"cache_expires_in_seconds"`   // How long until the cache expires\n    CacheTimestamp          string   `json:"cache_timestamp"`            // ISO 8601 timestamp of cached data (UTC)\n}\n\n// getDetailedStatus fetches detailed status with cache information\nfunc getDetailedStatus() (*DetailedStatusResponse, error) {\n    resp, err := http.Get("https://oswatch.bexli.dev/status")\n    if err != nil {\n        return nil, fmt.Errorf("failed to fetch detailed status: %w", err)\n    }\n    defer resp.Body.Close()\n\n    if resp.StatusCode != http.StatusOK {\n        return nil, fmt.Errorf("API returned status code: %d", resp.StatusCode)\n    }\n\n    var status DetailedStatusResponse\n    if err := json.NewDecoder(resp.Body).Decode(&status); err != nil {\n        return nil, fmt.Errorf("failed to decode response: %w", err)\n    }\n\n    return &status, nil\n}\n\nfunc main() {\n    detailed, err := getDetailedStatus()\n    if err != nil {\n        fmt.Printf("Error fetching detailed status: %v\\n", err)\n        return\n    }\n\n    fmt.Printf("Game: %s\\n", detailed.Game)\n    if detailed.Online != nil {\n        fmt.Printf("Online: %t\\n", *detailed.Online)\n    } else {\n        fmt.Printf("Online: unknown\\n")\n    }\n    fmt.Printf("Players: %d\\n", detailed.PlayerCount)\n    fmt.Printf("Homepage accessible: %t\\n", detailed.HomepageAccessible)\n    fmt.Printf("Cache age: %.1fs\\n", detailed.CacheAgeSeconds)\n    fmt.Printf("Cache expires in: %.1fs\\n", detailed.CacheExpiresInSeconds)\n    fmt.Printf("Last updated: %s\\n", detailed.CacheTimestamp)\n}',
-            },
-        ]
+        openapi_schema["paths"]["/status"]["get"]["x-code-samples"] = STATUS_CODE_SAMPLES
 
     app.openapi_schema = openapi_schema
     return app.openapi_schema
@@ -94,11 +126,39 @@ def custom_openapi() -> dict:
 app.openapi = custom_openapi
 
 
+# --- Conditional requests ---
+NOT_MODIFIED_RESPONSE = {"description": "Status unchanged since the ETag sent in If-None-Match"}
+
+
+def _cache_headers(etag: str, expires_in: float) -> dict[str, str]:
+    """Build the ETag and Cache-Control headers for a status response."""
+    return {"ETag": etag, "Cache-Control": f"max-age={int(expires_in)}"}
+
+
+def _strip_weak(etag: str) -> str:
+    """Drop the weak W/ prefix from an ETag."""
+    return etag.strip().removeprefix("W/")
+
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    """Check if the client already has the current status, per its If-None-Match header."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, W/"x" and "x" are the same tag
+    etag = _strip_weak(etag)
+    return any(_strip_weak(tag) == etag for tag in if_none_match.split(","))
+
+
 # --- API Endpoints ---
 @app.get(
     "/",
+    response_model=None,
     responses={
         200: {
+            "model": GameStatusResponse,
             "description": "Successful response with game status",
             "content": {
                 "application/json": {
@@ -131,47 +191,45 @@ app.openapi = custom_openapi
                 },
             },
         },
+        304: NOT_MODIFIED_RESPONSE,
     },
 )
-async def root() -> GameStatusResponse:
+async def root(request: Request) -> Response:
     """Get OSRS world status."""
-    is_online, player_count, homepage_accessible = is_game_online()
-
-    if not homepage_accessible:
-        return GameStatusResponse(
-            status="unknown",
-            player_count=0,
-            message="OSRS status unknown - homepage inaccessible",
-        )
-
-    return GameStatusResponse(
-        status="online" if is_online else "offline",
-        player_count=player_count,
-        message=f"OSRS is {'online' if is_online else 'offline'}"
-        + (f" with {player_count:,} players" if is_online else ""),
-    )
+    snapshot = await get_cache_snapshot()
+    cache_info = get_cache_info(snapshot)
 
+    headers = _cache_headers(snapshot.etag, cache_info["cache_expires_in_seconds"])
+    if _is_not_modified(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
 
-@app.get("/status")
-async def status() -> DetailedStatusResponse:
-    """Detailed status endpoint."""
-    is_online, player_count, homepage_accessible = is_game_online()
-    cache_info = get_cache_info()
-
-    # Convert cache timestamp to UTC format
-    cache_timestamp = (
-        dt.datetime.fromtimestamp(cache_info["timestamp"], dt.UTC).isoformat()
-        if cache_info["timestamp"] > 0
-        else dt.datetime.now(dt.UTC).isoformat()
-    )
+    # The body is serialized once per refresh
+    return Response(snapshot.response, media_type="application/json", headers=headers)
 
-    return DetailedStatusResponse(
-        game="Old School RuneScape",
-        online=is_online,
-        player_count=player_count,
-        homepage_accessible=homepage_accessible,
-        source=OSRS_HOMEPAGE,
-        cache_age_seconds=cache_info["cache_age_seconds"],
-        cache_expires_in_seconds=cache_info["cache_expires_in_seconds"],
-        cache_timestamp=cache_timestamp,
-    )
+
+@app.get(
+    "/status",
+    response_model=None,
+    responses={
+        200: {"model": DetailedStatusResponse},
+        304: NOT_MODIFIED_RESPONSE,
+    },
+)
+async def status(request: Request) -> Response:
+    """Detailed status endpoint."""
+    snapshot = await get_cache_snapshot()
+    cache_info = get_cache_info(snapshot)
+
+    # The ETag leaves out the cache age fields, they change on every request
+    headers = _cache_headers(snapshot.etag, cache_info["cache_expires_in_seconds"])
+    if _is_not_modified(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    # Only the cache age changes between refreshes
+    response = {
+        **snapshot.detailed_response,
+        "cache_age_seconds": cache_info["cache_age_seconds"],
+        "cache_expires_in_seconds": cache_info["cache_expires_in_seconds"],
+    }
+
+    return Response(orjson.dumps(response), media_type="application/json", headers=headers)
@@ -17,7 +17,6 @@ class GameStatusResponse(BaseModel):
         ...,
         example="online",
         description="Game status: 'online' if players detected, 'offline' if no players, 'unknown' if homepage inaccessible",
-        pattern="^(online|offline|unknown)$",
     )
     player_count: int = Field(
         ...,
@@ -92,22 +91,19 @@ class DetailedStatusResponse(BaseModel):
     cache_age_seconds: float = Field(
         ...,
         example=15.2,
-        description="How old the cached data is in seconds (0.0 to 60.0)",
+        description="How old the cached data is in seconds (0.0 to 60.0, up to 660.0 while the homepage is inaccessible)",
         ge=0.0,
-        le=60.0,
     )
     cache_expires_in_seconds: float = Field(
         ...,
         example=44.8,
-        description="How long until the cache expires in seconds (0.0 to 60.0)",
+        description="How long until the cache expires in seconds (0.0 to 60.0, up to 660.0 while the homepage is inaccessible)",
         ge=0.0,
-        le=60.0,
     )
     cache_timestamp: str = Field(
         ...,
         example="2025-06-15T14:30:45.123456+00:00",
-        description="ISO 8601 timestamp of when cached data was last fetched (UTC)",
-        pattern=r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}\+00:00$",
+        description="ISO 8601 timestamp of when cached data was last fetched (UTC), e.g. 2025-06-15T14:30:45.123456+00:00",
     )
 
     class Config:
@@ -1,41 +1,103 @@
 """OSRS homepage scraper functionality."""
 
 import logging
+import re
+from typing import TypedDict
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
 
-from config import OSRS_HOMEPAGE, REQUEST_TIMEOUT, USER_AGENT
+from config import MAX_PAGE_BYTES, OSRS_HOMEPAGE, REQUEST_TIMEOUT, USER_AGENT
 
 logger = logging.getLogger(__name__)
 
+# Text of the <p class="player-count"> tag, matched on the raw page rather than a parsed DOM.
+# player-count has to be a whole class token, so classes like player-count-label don't match
+_PLAYER_COUNT_RE = re.compile(
+    rb"""<p(?:\s[^>]*)?\sclass=["'](?:[^"']*\s)?player-count(?=[\s"'])[^>]*>([^<]*)<""",
+)
+_NON_DIGITS_RE = re.compile(r"\D+")
 
-def get_player_count_text() -> str | None:
+# Bytes of already searched page to search again with each chunk, in case the tag was split across chunks
+_MATCH_OVERLAP = 1024
+
+
+class LastFetch(TypedDict):
+    """Type definition for the last successful homepage fetch."""
+
+    etag: str | None
+    last_modified: str | None
+    player_count_text: str | None
+
+
+_last_fetch: LastFetch = {
+    "etag": None,
+    "last_modified": None,
+    "player_count_text": None,
+}
+
+# Shared client, keeps the connection to the OSRS homepage alive between fetches
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it if needed."""
+    global _client  # noqa: PLW0603
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            # Only the homepage is ever fetched, one keep-alive connection is enough
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=1),
+            timeout=REQUEST_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client."""
+    if _client is not None:
+        await _client.aclose()
+
+
+async def get_player_count_text() -> str | None:
     """Get player count text from OSRS homepage."""
     try:
-        # Set user agent
-        headers = {
-            "User-Agent": USER_AGENT,
-        }
+        # Let the homepage skip the body if it hasn't changed since the last fetch
+        headers = {}
+        if _last_fetch["etag"]:
+            headers["If-None-Match"] = _last_fetch["etag"]
+        if _last_fetch["last_modified"]:
+            headers["If-Modified-Since"] = _last_fetch["last_modified"]
 
-        # Get homepage text
-        response = requests.get(OSRS_HOMEPAGE, timeout=REQUEST_TIMEOUT, headers=headers)
-        response.raise_for_status()
+        # Get homepage text, reading only as far as the target tag
+        async with _get_client().stream("GET", OSRS_HOMEPAGE, headers=headers) as response:
+            if response.status_code == httpx.codes.NOT_MODIFIED:
+                return _last_fetch["player_count_text"]
+            response.raise_for_status()
 
-        # Parse text
-        soup = BeautifulSoup(response.content, "html.parser")
+            # Find target tag, searching only the newly read part of the page.
+            # Stopping early closes the connection on HTTP/1.1, only h2 can keep it open for the next fetch
+            body = bytearray()
+            match = None
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                match = _PLAYER_COUNT_RE.search(body, max(0, len(body) - len(chunk) - _MATCH_OVERLAP))
+                if match or len(body) >= MAX_PAGE_BYTES:
+                    break
 
-        # Find target tag
-        player_count_element = soup.find("p", class_="player-count")
-        if player_count_element:
-            return player_count_element.text
+        player_count_text = match.group(1).decode(errors="replace") if match else None
 
-    except requests.RequestException:
+    except httpx.HTTPError:
         logger.exception("Error fetching player count")
         return None
 
-    else:
-        return None
+    # Only keep validators for pages we found a player count in
+    _last_fetch["player_count_text"] = player_count_text
+    _last_fetch["etag"] = response.headers.get("ETag") if player_count_text else None
+    _last_fetch["last_modified"] = response.headers.get("Last-Modified") if player_count_text else None
+
+    return player_count_text
 
 
 def get_player_count(player_count_text: str) -> int:
@@ -43,5 +105,5 @@ def get_player_count(player_count_text: str) -> int:
     if not player_count_text:
         return 0
 
-    digits = "".join([num for num in player_count_text if num.isdigit()])
+    digits = _NON_DIGITS_RE.sub("", player_count_text)
     return int(digits) if digits else 0
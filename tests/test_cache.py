@@ -0,0 +1,18 @@
+"""Tests for the cache backoff."""
+
+import pytest
+
+from cache import _backoff_ttl
+from config import CACHE_DURATION, MAX_CACHE_DURATION
+
+
+def test_backoff_ttl_without_failures() -> None:
+    """A successful refresh is cached for CACHE_DURATION, without jitter."""
+    assert _backoff_ttl(0) == CACHE_DURATION
+
+
+@pytest.mark.parametrize("consecutive_failures", [1, 2, 10, 1024, 10**6])
+def test_backoff_ttl_stays_within_ceiling(consecutive_failures: int) -> None:
+    """Any number of failed refreshes backs off to at most MAX_CACHE_DURATION, plus jitter."""
+    ttl = _backoff_ttl(consecutive_failures)
+    assert CACHE_DURATION < ttl <= MAX_CACHE_DURATION * 1.1
@@ -0,0 +1,38 @@
+"""Tests for extracting the player count from the OSRS homepage."""
+
+import asyncio
+
+import httpx
+import pytest
+
+import scraper
+
+DECOY = b"""<p class="player-count-label">Players 5</p><p data-class="player-count">7</p>"""
+
+
+@pytest.mark.parametrize(
+    ("page", "expected"),
+    [
+        (b"""<p class="player-count">There are currently 123,456 people playing!</p>""", "There are currently 123,456 people playing!"),
+        (b"""<p class='player-count'>123,456</p>""", "123,456"),
+        (b"""<p id="count" class="text player-count centered">123,456</p>""", "123,456"),
+        (DECOY + b"""<p class="player-count">123,456</p>""", "123,456"),
+        (DECOY, None),
+    ],
+)
+def test_get_player_count_text(monkeypatch: pytest.MonkeyPatch, page: bytes, expected: str | None) -> None:
+    """Only a <p> tag with a whole player-count class token is matched."""
+    monkeypatch.setattr(scraper, "_last_fetch", {"etag": None, "last_modified": None, "player_count_text": None})
+    monkeypatch.setattr(
+        scraper,
+        "_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(lambda _: httpx.Response(200, content=page))),
+    )
+
+    assert asyncio.run(scraper.get_player_count_text()) == expected
+
+
+def test_get_player_count() -> None:
+    """Everything but digits is ignored when parsing the player count."""
+    assert scraper.get_player_count("There are currently 123,456 people playing!") == 123456
+    assert scraper.get_player_count("") == 0